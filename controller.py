@@ -20,6 +20,9 @@ Requisitos:
 - Controlador Floodlight activo con módulo de reactive routing desactivado
 - Red de switches OpenFlow configurada
 
+Variables de entorno:
+- LOG_LEVEL: nivel de los mensajes de la red SDN (DEBUG, INFO, WARNING, ERROR); por defecto INFO
+
 Código: 20216352
 Fecha: Junio 2025
 """
@@ -28,11 +31,170 @@ import yaml
 import os
 import sys
 import requests
-import uuid
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-from typing import List, Dict, Any, Tuple, Optional
+import collections
+import itertools
+import heapq
+import operator
+import copy
+import functools
+import time
+import concurrent.futures
+import multiprocessing
+import logging
+import logging.handlers
+import queue
+import secrets
+from typing import List, Dict, Any, Tuple, Optional, Sequence
+
+# Los mensajes de las operaciones contra el controlador van por este logger;
+# main() los escribe desde un hilo aparte y LOG_LEVEL permite silenciarlos
+logger = logging.getLogger("sdn")
+_cola_logs: Optional[queue.Queue] = None  # Cola del QueueListener, si main() la configuró
+
+
+def _esperar_logs() -> None:
+    """Espera a que el hilo de logging escriba los mensajes encolados"""
+    if _cola_logs is not None:
+        _cola_logs.join()
+
+
+# Usar los bindings en C de libyaml si están disponibles (mucho más rápidos)
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+
+# orjson es opcional: si no está instalado se usa el módulo json estándar
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _json_dumps(obj: Any) -> bytes:
+    """Serializa un objeto a JSON (bytes) con orjson si está disponible"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    # Mismo formato compacto que produce orjson
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    """Deserializa JSON con orjson si está disponible"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _clave(valor: Any) -> str:
+    """Convierte un identificador a string internado para usarlo como clave de diccionario"""
+    return sys.intern(valor if type(valor) is str else str(valor))
+
+
+# Tabla para eliminar separadores de una MAC en una sola pasada
+_MAC_STRIP = str.maketrans('', '', ':-')
+
+
+@functools.lru_cache(maxsize=256)
+def _norm_mac(mac: str) -> str:
+    """Normaliza una MAC a minúsculas y sin separadores para poder compararla"""
+    return mac.lower().translate(_MAC_STRIP)
+
+
+# Puntos de conexión simulados según la topología, usados si el controlador no responde.
+# Se indexan por MAC normalizada y los DPID se internan para comparar por identidad.
+_SIMULATED_MAC_MAP = {
+    _norm_mac(mac): (sys.intern(dpid), puerto)
+    for mac, (dpid, puerto) in {
+        "aa:51:aa:ba:72:41": ("00:00:aa:51:aa:ba:72:41", 2),
+        "1a:74:72:3f:ef:44": ("00:00:1a:74:72:3f:ef:44", 2),
+        "fe:16:3e:2c:76:52": ("00:00:5e:c7:6e:c6:11:4c", 1),
+        "fa:16:3e:f4:1f:11": ("00:00:aa:51:aa:ba:72:41", 2),
+        "fe:16:3e:6c:cf:e4": ("00:00:f2:20:f9:45:4c:4e", 3),
+        "5e:c7:6e:c6:11:4c": ("00:00:5e:c7:6e:c6:11:4c", 2),
+        "fa:16:3e:cd:5b:bd": ("00:00:aa:51:aa:ba:72:41", 2),
+        "72:e0:80:7e:85:4c": ("00:00:72:e0:80:7e:85:4c", 2),
+        "fe:16:3e:d5:92:74": ("00:00:1a:74:72:3f:ef:44", 3),
+        "fa:16:3e:05:f4:08": ("00:00:5e:c7:6e:c6:11:4c", 1),
+        "fe:16:3e:ec:df:26": ("00:00:aa:51:aa:ba:72:41", 5),
+        "fa:16:3e:c4:a9:9d": ("00:00:f2:20:f9:45:4c:4e", 3),
+        "fa:16:3e:3f:1a:fd": ("00:00:5e:c7:6e:c6:11:4c", 3),
+        "fe:16:3e:84:34:52": ("00:00:5e:c7:6e:c6:11:4c", 3),
+        "fe:16:3e:dc:6e:fa": ("00:00:72:e0:80:7e:85:4c", 2),
+        "fa:16:3e:d6:a2:a3": ("00:00:1a:74:72:3f:ef:44", 3),
+        "fe:16:3e:d3:02:36": ("00:00:aa:51:aa:ba:72:41", 2),
+        "f2:20:f9:45:4c:4e": ("00:00:f2:20:f9:45:4c:4e", 3),
+        "fe:16:3e:8b:eb:df": ("00:00:72:e0:80:7e:85:4c", 2),
+    }.items()
+}
+
+# Esquema de cada registro del YAML: campos obligatorios, en el orden del constructor.
+# Extraen todos los campos en una sola llamada y fallan con KeyError si falta alguno.
+_CAMPOS_SERVIDOR = operator.itemgetter('nombre', 'ip')
+_CAMPOS_SERVICIO = operator.itemgetter('nombre', 'protocolo', 'puerto')
+_CAMPOS_ALUMNO = operator.itemgetter('nombre', 'codigo', 'mac')
+_CAMPOS_CURSO = operator.itemgetter('codigo', 'nombre', 'estado')
+
+# Campos comunes a todos los flujos que se instalan con StaticFlowPusher
+_FLOW_TEMPLATE = {
+    "cookie": "0",
+    "priority": "32768",
+    "active": "true"
+}
+_IPV4_FLOW_TEMPLATE = {**_FLOW_TEMPLATE, "eth_type": "0x0800"}  # IPv4
+_ARP_FLOW_TEMPLATE = {**_FLOW_TEMPLATE, "eth_type": "0x0806"}  # ARP
+_FLUJOS_POR_SWITCH = 4  # IPv4 y ARP, en ambos sentidos
+
+# Tamaño (bytes) a partir del cual los documentos de un YAML se parsean en paralelo
+_PARALLEL_PARSE_THRESHOLD = 1024 * 1024
+
+
+def _parse_chunk(chunk: bytes) -> dict:
+    """Parsea un único documento YAML (se ejecuta en un proceso del pool)"""
+    return yaml.load(chunk, Loader=_Loader) or {}
+
+
+def _cargar_yaml(ruta_archivo: str) -> dict:
+    """
+    Carga un archivo YAML de uno o varios documentos y fusiona sus secciones.
+    
+    Los archivos grandes separados en documentos ('---') se parsean en paralelo,
+    un documento por proceso, si hay más de un CPU; en otro caso se leen de
+    forma secuencial para no pagar el arranque del pool.
+    """
+    datos = {}
+    cpus = os.cpu_count() or 1
+    if cpus > 1 and os.path.getsize(ruta_archivo) > _PARALLEL_PARSE_THRESHOLD:
+        with open(ruta_archivo, 'rb') as archivo:
+            contenido = archivo.read()
+        chunks = contenido.split(b'\n---\n')
+        if len(chunks) > 1:
+            # forkserver evita hacer fork del proceso principal, que ya tiene el hilo de logging
+            metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(len(chunks), cpus),
+                    mp_context=multiprocessing.get_context(metodo)) as pool:
+                for parte in pool.map(_parse_chunk, chunks):
+                    datos.update(parte)
+            return datos
+        # Un único documento: se parsean los bytes ya leídos
+        for parte in yaml.load_all(contenido, Loader=_Loader):
+            if parte:
+                datos.update(parte)
+        return datos
+    
+    with open(ruta_archivo, 'r') as archivo:
+        for parte in yaml.load_all(archivo, Loader=_Loader):
+            if parte:
+                datos.update(parte)
+    return datos
+
 
 class Alumno:
+    __slots__ = ('nombre', 'codigo', 'mac')
+    
     def __init__(self, nombre: str, codigo: str, mac: str):
         self.nombre = nombre
         self.codigo = codigo
@@ -43,8 +205,11 @@ class Alumno:
 
 
 class Servicio:
+    __slots__ = ('nombre', 'protocolo', 'puerto', '_nombre_cf')
+    
     def __init__(self, nombre: str, protocolo: str, puerto: int):
         self.nombre = nombre
+        self._nombre_cf = nombre.casefold()  # Nombre normalizado para comparaciones sin distinguir mayúsculas
         self.protocolo = protocolo
         self.puerto = puerto
     
@@ -53,71 +218,132 @@ class Servicio:
 
 
 class Servidor:
+    __slots__ = ('nombre', 'ip', 'servicios', 'servicios_by_name')
+    
     def __init__(self, nombre: str, ip: str):
         self.nombre = nombre
         self.ip = ip
         self.servicios = []
+        self.servicios_by_name = {}  # Dict[nombre_servicio_normalizado, Servicio]
     
     def agregar_servicio(self, servicio: Servicio) -> None:
         self.servicios.append(servicio)
+        self.servicios_by_name.setdefault(servicio._nombre_cf, servicio)
     
     def __str__(self) -> str:
         return f"Servidor: {self.nombre}, IP: {self.ip}"
 
 
 class Curso:
+    __slots__ = ('codigo', 'nombre', 'estado', 'alumnos', 'servidores', 'permitidos_cf')
+    
     def __init__(self, codigo: str, nombre: str, estado: str):
         self.codigo = codigo
         self.nombre = nombre
         self.estado = estado
-        self.alumnos = []  # Lista de códigos de alumnos
-        self.servidores = []  # Lista de pares (servidor, [servicios_permitidos])
+        self.alumnos = set()  # Conjunto de códigos de alumnos
+        self.servidores: Dict[str, Tuple[Servidor, frozenset]] = {}  # Dict[nombre_servidor, (servidor, servicios_permitidos)]
+        self.permitidos_cf: Dict[str, frozenset] = {}  # Dict[nombre_servidor, servicios_permitidos normalizados con casefold]
     
     def agregar_alumno(self, codigo_alumno: str) -> None:
-        if codigo_alumno not in self.alumnos:
-            self.alumnos.append(codigo_alumno)
+        self.alumnos.add(codigo_alumno)
     
     def remover_alumno(self, codigo_alumno: str) -> None:
-        if codigo_alumno in self.alumnos:
-            self.alumnos.remove(codigo_alumno)
+        self.alumnos.discard(codigo_alumno)
     
     def agregar_servidor(self, servidor: Servidor, servicios_permitidos: List[str]) -> None:
-        self.servidores.append((servidor, servicios_permitidos))
+        # Si el servidor ya estaba asociado, se suman los servicios permitidos
+        _, previos = self.servidores.get(servidor.nombre, (None, frozenset()))
+        permitidos = previos | frozenset(servicios_permitidos)
+        self.servidores[servidor.nombre] = (servidor, permitidos)
+        self.permitidos_cf[servidor.nombre] = frozenset(s.casefold() for s in permitidos)
     
     def __str__(self) -> str:
         return f"Curso: {self.nombre} ({self.codigo}), Estado: {self.estado}"
 
 
 class Conexion:
+    __slots__ = ('id', 'alumno', 'servidor', 'servicio', 'ruta', '_str')
+    # El ID forma parte del nombre de los flujos, que es global en el controlador: el prefijo
+    # aleatorio de cada ejecución evita pisar flujos de sesiones anteriores o de otra instancia
+    _id_prefijo = f"{secrets.randbits(20):05x}"  # 5 dígitos hex: el ID ocupa 10 caracteres
+    _id_counter = itertools.count(1)  # Contador compartido dentro de esta ejecución
+    
     def __init__(self, alumno: Alumno, servidor: Servidor, servicio: Servicio, ruta: List = None):
-        self.id = str(uuid.uuid4())[:8]  # Genera un ID único para la conexión
+        self.id = f"c{Conexion._id_prefijo}{next(Conexion._id_counter):04x}"  # Genera un ID único para la conexión
         self.alumno = alumno
         self.servidor = servidor
         self.servicio = servicio
         self.ruta = ruta or []
+        self._str = None
     
     def __str__(self) -> str:
-        return (f"Conexión {self.id}: {self.alumno.nombre} -> "
-                f"{self.servidor.nombre} ({self.servicio.nombre})")
+        # El texto se arma la primera vez que se muestra y se reutiliza después
+        if self._str is None:
+            self._str = (f"Conexión {self.id}: {self.alumno.nombre} -> "
+                         f"{self.servidor.nombre} ({self.servicio.nombre})")
+        return self._str
 
 
 class SDNController:
+    # Tiempo (s) durante el cual se reutiliza la lista de dispositivos del controlador
+    AP_CACHE_TTL = 30.0
+    # Tiempo mínimo (s) entre intentos de descarga, para no insistir con el controlador caído
+    AP_MISS_REFRESH = 1.0
+    # Tiempo (s) tras el cual se vuelve a descargar la topología y se recalculan las rutas
+    ROUTE_CACHE_TTL = 10.0
+    
     def __init__(self, controller_ip: str = "localhost"):
         self.alumnos = {}  # Dict[codigo, Alumno]
         self.servidores = {}  # Dict[nombre, Servidor]
         self.cursos = {}  # Dict[codigo, Curso]
+        self.alumno_a_cursos: Dict[str, set] = collections.defaultdict(set)  # Dict[codigo_alumno, {codigos_curso}]
+        self._service_index: Dict[Tuple[str, str], List[str]] = {}  # Dict[(servidor, servicio), [codigos_curso]]
+        self.auth_index: Dict[Tuple[str, str, str], Curso] = {}  # Dict[(codigo_alumno, servidor, servicio_lower), curso]
+        self.cursos_activos_por_alumno: Dict[str, List[Curso]] = {}  # Dict[codigo_alumno, [cursos DICTANDO]]
         self.conexiones = {}  # Dict[id, Conexion]
         self.controller_ip = controller_ip
         self.controller_port = 8080  # Puerto por defecto de la API REST de Floodlight
+        self.timeout = 2.0  # Tiempo máximo de espera (s) para las llamadas a Floodlight
+        
+        # Sesión HTTP persistente para reutilizar las conexiones TCP con Floodlight
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.1)
+        ))
+        # Todas las peticiones a Floodlight envían y reciben JSON
+        self.session.headers.update({'Accept': 'application/json', 'Content-Type': 'application/json'})
         
         # Para mantener un registro de los flujos instalados por cada conexión
-        self.conexion_flujos = {}  # Dict[id_conexion, List[flow_ids]]
+        self.conexion_flujos = {}  # Dict[id_conexion, Tuple[flow_ids]]
+        
+        # Caché de archivos YAML ya parseados, indexada por ruta y validada por mtime
+        self._yaml_cache: Dict[str, Tuple[float, dict]] = {}  # Dict[ruta, (mtime, datos)]
+        
+        # Puntos de conexión de todos los hosts, descargados de una vez desde /wm/device/
+        self._devices_cache: Dict[str, Tuple[str, int]] = {}  # Dict[mac_norm, (dpid, puerto)]
+        self._devices_ts: float = 0.0  # Instante de la última descarga
+        self._devices_intento_ts: float = 0.0  # Instante del último intento de descarga
+        self._devices_faltantes = set()  # MACs ausentes en la última descarga (se vacía al descargar)
+        
+        # Rutas precalculadas a partir de la topología (o devueltas por el controlador),
+        # se recalculan completas cada ROUTE_CACHE_TTL
+        self._route_cache: Dict[Tuple[str, str], List[Tuple[str, int]]] = {}  # Dict[(src_dpid, dst_dpid), ruta]
+        self._route_cache_time: float = 0.0
     
-    def importar_archivo(self, ruta_archivo: str) -> bool:
-        """Importa datos desde un archivo YAML"""
+    def importar_archivo(self, ruta_archivo: str, verbose: bool = False) -> bool:
+        """Importa datos desde un archivo YAML (con verbose=True se detalla cada alumno procesado)"""
         try:
-            with open(ruta_archivo, 'r') as archivo:
-                datos = yaml.safe_load(archivo)
+            # Reutilizar el resultado del último parseo si el archivo no ha cambiado
+            mtime = os.stat(ruta_archivo).st_mtime
+            cache = self._yaml_cache.get(ruta_archivo)
+            if cache and cache[0] == mtime:
+                datos = copy.deepcopy(cache[1])
+            else:
+                datos = _cargar_yaml(ruta_archivo)
+                self._yaml_cache[ruta_archivo] = (mtime, copy.deepcopy(datos))
             
             print(f"Importando archivo {ruta_archivo}...")
             
@@ -125,55 +351,41 @@ class SDNController:
             self.alumnos.clear()
             self.servidores.clear()
             self.cursos.clear()
+            self.alumno_a_cursos.clear()
+            self._service_index.clear()
+            self.auth_index.clear()
+            self.cursos_activos_por_alumno.clear()
             
             # Procesar servidores y servicios primero
             if 'servidores' in datos:
                 print(f"Procesando {len(datos['servidores'])} servidores...")
                 for srv_data in datos['servidores']:
-                    servidor = Servidor(srv_data['nombre'], srv_data['ip'])
+                    nombre_servidor, ip = _CAMPOS_SERVIDOR(srv_data)
+                    servidor = Servidor(_clave(nombre_servidor), ip)
                     if 'servicios' in srv_data:
                         for svc_data in srv_data['servicios']:
-                            servicio = Servicio(
-                                svc_data['nombre'],
-                                svc_data['protocolo'],
-                                svc_data['puerto']
-                            )
-                            servidor.agregar_servicio(servicio)
+                            servidor.agregar_servicio(Servicio(*_CAMPOS_SERVICIO(svc_data)))
                     self.servidores[servidor.nombre] = servidor
             
             # Procesar alumnos
             if 'alumnos' in datos:
                 print(f"Procesando {len(datos['alumnos'])} alumnos...")
                 for alu_data in datos['alumnos']:
-                    alumno = Alumno(
-                        alu_data['nombre'],
-                        alu_data['codigo'],
-                        alu_data['mac']
-                    )
+                    nombre, codigo, mac = _CAMPOS_ALUMNO(alu_data)
+                    alumno = Alumno(nombre, _clave(codigo), mac)
                     self.alumnos[alumno.codigo] = alumno
-                    print(f"  - Alumno registrado: {alumno.codigo} - {alumno.nombre}")
+                    if verbose:
+                        print(f"  - Alumno registrado: {alumno.codigo} - {alumno.nombre}")
             
             # Procesar cursos
             if 'cursos' in datos:
                 print(f"Procesando {len(datos['cursos'])} cursos...")
                 for curso_data in datos['cursos']:
                     try:
-                        codigo = curso_data['codigo']
-                        nombre = curso_data['nombre']
-                        estado = curso_data['estado']
+                        codigo, nombre, estado = _CAMPOS_CURSO(curso_data)
                         print(f"  - Curso: {codigo} - {nombre} ({estado})")
                         
-                        curso = Curso(codigo, nombre, estado)
-                        
-                        # Agregar alumnos al curso
-                        if 'alumnos' in curso_data and curso_data['alumnos']:
-                            alumnos_lista = curso_data['alumnos']
-                            print(f"    * Procesando {len(alumnos_lista)} alumnos en el curso")
-                            for codigo_alumno in alumnos_lista:
-                                # Asegurarse de que el código sea un string
-                                codigo_alumno_str = str(codigo_alumno).strip()
-                                curso.agregar_alumno(codigo_alumno_str)
-                                print(f"    * Añadido alumno con código: {codigo_alumno_str}")
+                        curso = Curso(_clave(codigo), nombre, estado)
                         
                         # Agregar servidores y servicios permitidos al curso
                         if 'servidores' in curso_data:
@@ -182,13 +394,43 @@ class SDNController:
                                 servicios_permitidos = srv_data['servicios_permitidos']
                                 
                                 if nombre_servidor in self.servidores:
-                                    curso.agregar_servidor(
+                                    self.agregar_servidor_curso(
+                                        curso,
                                         self.servidores[nombre_servidor],
                                         servicios_permitidos
                                     )
                                     print(f"    * Añadido servidor: {nombre_servidor} con servicios: {servicios_permitidos}")
                         
-                        self.cursos[curso.codigo] = curso
+                        # Con los servidores ya cargados, el curso se registra antes que sus alumnos
+                        # para indexar a cada alumno en la misma pasada en que se lee
+                        previo = self.cursos.get(curso.codigo)
+                        self._registrar_curso(curso)
+                        
+                        # Agregar alumnos al curso
+                        try:
+                            if 'alumnos' in curso_data and curso_data['alumnos']:
+                                alumnos_lista = curso_data['alumnos']
+                                print(f"    * Procesando {len(alumnos_lista)} alumnos en el curso")
+                                for codigo_alumno in alumnos_lista:
+                                    # Asegurarse de que el código sea un string, convirtiendo
+                                    # y recortando solo cuando hace falta
+                                    codigo_alumno_str = codigo_alumno if type(codigo_alumno) is str else str(codigo_alumno)
+                                    if codigo_alumno_str[:1].isspace() or codigo_alumno_str[-1:].isspace():
+                                        codigo_alumno_str = codigo_alumno_str.strip()
+                                    codigo_alumno_str = sys.intern(codigo_alumno_str)
+                                    if verbose:
+                                        print(f"    * Añadido alumno con código: {codigo_alumno_str}")
+                                    if codigo_alumno_str in curso.alumnos:
+                                        continue
+                                    curso.agregar_alumno(codigo_alumno_str)
+                                    self._indexar_alumno_curso(curso, codigo_alumno_str)
+                        except Exception:
+                            # Deshacer el curso a medio cargar y dejar el anterior, si lo había
+                            self._desindexar_curso(curso)
+                            del self.cursos[curso.codigo]
+                            if previo is not None:
+                                self._registrar_curso(previo)
+                            raise
                     except Exception as e:
                         print(f"ERROR al procesar curso: {e}")
                         # Continuar con el siguiente curso si hay un error
@@ -202,61 +444,72 @@ class SDNController:
             print(f"Error al importar archivo: {e}")
             return False
     
-    def exportar_archivo(self, ruta_archivo: str) -> bool:
-        """Exporta datos a un archivo YAML"""
-        try:
-            # Construir la estructura de datos para exportar
-            datos = {
-                'alumnos': [],
-                'cursos': [],
-                'servidores': []
+    def _generar_alumnos(self):
+        """Genera, uno a uno, los registros de alumnos a exportar"""
+        for codigo, alumno in self.alumnos.items():
+            yield {
+                'nombre': alumno.nombre,
+                'codigo': alumno.codigo,
+                'mac': alumno.mac
             }
-            
-            # Exportar alumnos
-            for codigo, alumno in self.alumnos.items():
-                datos['alumnos'].append({
-                    'nombre': alumno.nombre,
-                    'codigo': alumno.codigo,
-                    'mac': alumno.mac
-                })
-            
-            # Exportar servidores y servicios
-            for nombre, servidor in self.servidores.items():
-                srv_data = {
-                    'nombre': servidor.nombre,
-                    'ip': servidor.ip,
-                    'servicios': []
-                }
-                
-                for servicio in servidor.servicios:
-                    srv_data['servicios'].append({
+    
+    def _generar_servidores(self):
+        """Genera, uno a uno, los registros de servidores (con sus servicios) a exportar"""
+        for nombre, servidor in self.servidores.items():
+            yield {
+                'nombre': servidor.nombre,
+                'ip': servidor.ip,
+                'servicios': [
+                    {
                         'nombre': servicio.nombre,
                         'protocolo': servicio.protocolo,
                         'puerto': servicio.puerto
-                    })
-                
-                datos['servidores'].append(srv_data)
-            
-            # Exportar cursos
-            for codigo, curso in self.cursos.items():
-                curso_data = {
-                    'codigo': curso.codigo,
-                    'nombre': curso.nombre,
-                    'estado': curso.estado,
-                    'alumnos': curso.alumnos,
-                    'servidores': []
-                }
-                
-                for srv, servicios_permitidos in curso.servidores:
-                    curso_data['servidores'].append({
+                    }
+                    for servicio in servidor.servicios
+                ]
+            }
+    
+    def _generar_cursos(self):
+        """Genera, uno a uno, los registros de cursos a exportar"""
+        for codigo, curso in self.cursos.items():
+            yield {
+                'codigo': curso.codigo,
+                'nombre': curso.nombre,
+                'estado': curso.estado,
+                'alumnos': sorted(curso.alumnos),
+                'servidores': [
+                    {
                         'nombre': srv.nombre,
-                        'servicios_permitidos': servicios_permitidos
-                    })
-                
-                datos['cursos'].append(curso_data)
-              # Guardar el archivo
+                        'servicios_permitidos': sorted(servicios_permitidos)
+                    }
+                    for srv, servicios_permitidos in curso.servidores.values()
+                ]
+            }
+    
+    def exportar_archivo(self, ruta_archivo: str) -> bool:
+        """Exporta datos a un archivo YAML"""
+        try:
+            secciones = (
+                ('alumnos', self._generar_alumnos()),
+                ('servidores', self._generar_servidores()),
+                ('cursos', self._generar_cursos())
+            )
+            
+            # Guardar el archivo, una sección por documento para poder parsearlas en paralelo.
+            # Cada registro se serializa y escribe por separado para no construir en memoria
+            # la estructura completa del archivo.
             with open(ruta_archivo, 'w') as archivo:
-                yaml.dump(datos, archivo, default_flow_style=False, allow_unicode=True)
+                for seccion, registros in secciones:
+                    archivo.write(f"---\n{seccion}:")
+                    vacia = True
+                    for registro in registros:
+                        if vacia:
+                            archivo.write("\n")
+                            vacia = False
+                        yaml.dump([registro], archivo, Dumper=_Dumper,
+                                  default_flow_style=False, allow_unicode=True)
+                    if vacia:
+                        archivo.write(" []\n")
             
             print(f"Datos exportados correctamente a {ruta_archivo}")
             return True
@@ -265,6 +518,99 @@ class SDNController:
             print(f"Error al exportar archivo: {e}")
             return False
     
+    def agregar_servidor_curso(self, curso: Curso, servidor: Servidor, servicios_permitidos: List[str]) -> None:
+        """Asocia un servidor a un curso y actualiza el índice (servidor, servicio) -> cursos"""
+        curso.agregar_servidor(servidor, servicios_permitidos)
+        
+        # Durante la importación el curso aún no está registrado; se indexa al terminar de cargarlo
+        if self.cursos.get(curso.codigo) is curso:
+            self._indexar_servicios(curso.codigo, servidor.nombre, servicios_permitidos)
+            for codigo_alumno in curso.alumnos:
+                self._autorizar_alumno(curso, codigo_alumno)
+    
+    def _registrar_curso(self, curso: Curso) -> None:
+        """
+        Registra un curso ya cargado y lo agrega a los índices. Si había otro curso
+        con el mismo código, primero se retiran sus entradas, porque lo reemplaza.
+        """
+        previo = self.cursos.get(curso.codigo)
+        if previo is not None:
+            self._desindexar_curso(previo)
+        
+        self.cursos[curso.codigo] = curso
+        
+        # Los índices se llenan solo con cursos ya registrados
+        for nombre_servidor, (_, permitidos) in curso.servidores.items():
+            self._indexar_servicios(curso.codigo, nombre_servidor, permitidos)
+        for codigo_alumno in curso.alumnos:
+            self._indexar_alumno_curso(curso, codigo_alumno)
+    
+    def _desindexar_curso(self, curso: Curso) -> None:
+        """Retira un curso de todos los índices (servicios, alumnos y autorizaciones)"""
+        self._desindexar_servicios(curso)
+        for codigo_alumno in curso.alumnos:
+            self.alumno_a_cursos[codigo_alumno].discard(curso.codigo)
+            self._desactivar_curso_alumno(curso, codigo_alumno)
+    
+    def _indexar_alumno_curso(self, curso: Curso, codigo_alumno: str) -> None:
+        """Registra a un alumno de un curso ya registrado en los índices"""
+        self.alumno_a_cursos[codigo_alumno].add(curso.codigo)
+        self._activar_curso_alumno(curso, codigo_alumno)
+    
+    def _indexar_servicios(self, codigo_curso: str, nombre_servidor: str, servicios) -> None:
+        """Registra el curso en el índice (servidor, servicio) -> cursos"""
+        for servicio in servicios:
+            codigos = self._service_index.setdefault((nombre_servidor, servicio), [])
+            if codigo_curso not in codigos:
+                codigos.append(codigo_curso)
+    
+    def _desindexar_servicios(self, curso: Curso) -> None:
+        """Quita el curso del índice (servidor, servicio) -> cursos"""
+        for nombre_servidor, (_, permitidos) in curso.servidores.items():
+            for servicio in permitidos:
+                codigos = self._service_index.get((nombre_servidor, servicio))
+                if codigos and curso.codigo in codigos:
+                    codigos.remove(curso.codigo)
+                    if not codigos:
+                        del self._service_index[(nombre_servidor, servicio)]
+    
+    def _activar_curso_alumno(self, curso: Curso, codigo_alumno: str) -> None:
+        """Registra un curso DICTANDO del alumno en los índices de cursos activos y de autorización"""
+        if curso.estado != "DICTANDO":
+            return
+        activos = self.cursos_activos_por_alumno.setdefault(codigo_alumno, [])
+        if curso not in activos:
+            activos.append(curso)
+        self._autorizar_alumno(curso, codigo_alumno)
+    
+    def _desactivar_curso_alumno(self, curso: Curso, codigo_alumno: str) -> None:
+        """Quita un curso del alumno de los índices de cursos activos y de autorización"""
+        activos = self.cursos_activos_por_alumno.get(codigo_alumno, [])
+        if curso in activos:
+            activos.remove(curso)
+        self._desautorizar_alumno(curso, codigo_alumno)
+    
+    def _autorizar_alumno(self, curso: Curso, codigo_alumno: str) -> None:
+        """Registra en auth_index los servicios a los que el curso da acceso al alumno"""
+        if curso.estado != "DICTANDO":
+            return
+        for nombre_servidor, permitidos in curso.permitidos_cf.items():
+            for servicio in permitidos:
+                self.auth_index.setdefault((codigo_alumno, nombre_servidor, servicio), curso)
+    
+    def _desautorizar_alumno(self, curso: Curso, codigo_alumno: str) -> None:
+        """Quita de auth_index los accesos que el curso daba al alumno"""
+        for nombre_servidor, permitidos in curso.permitidos_cf.items():
+            for servicio in permitidos:
+                clave = (codigo_alumno, nombre_servidor, servicio)
+                if self.auth_index.get(clave) is curso:
+                    del self.auth_index[clave]
+        
+        # Otro curso activo del alumno puede seguir dando acceso a los mismos servicios
+        for otro in self.cursos_activos_por_alumno.get(codigo_alumno, ()):
+            if otro is not curso:
+                self._autorizar_alumno(otro, codigo_alumno)
+    
     def listar_alumnos(self, codigo_curso: str = None) -> None:
         """Lista todos los alumnos o solo los de un curso específico"""
         if codigo_curso:
@@ -278,10 +624,10 @@ class SDNController:
                     print("Este curso no tiene alumnos matriculados.")
                     return
                 
-                print("\nCódigos de alumnos en este curso:", curso.alumnos)
+                print("\nCódigos de alumnos en este curso:", sorted(curso.alumnos))
                 
                 alumnos_encontrados = False
-                for codigo_alumno in curso.alumnos:
+                for codigo_alumno in sorted(curso.alumnos):
                     if codigo_alumno in self.alumnos:
                         alumno = self.alumnos[codigo_alumno]
                         print(f"- {alumno}")
@@ -302,8 +648,7 @@ class SDNController:
                 print("No hay alumnos registrados en el sistema.")
                 return
                 
-            for codigo, alumno in self.alumnos.items():
-                print(f"- {alumno}")
+            sys.stdout.write("".join(f"- {alumno}\n" for alumno in self.alumnos.values()))
                 
             print(f"\nTotal de alumnos: {len(self.alumnos)}")
     
@@ -317,9 +662,9 @@ class SDNController:
             
             # Mostrar cursos en los que está matriculado
             cursos_matriculado = []
-            for codigo, curso in self.cursos.items():
-                if alumno.codigo in curso.alumnos:
-                    cursos_matriculado.append(f"{curso.codigo} - {curso.nombre}")
+            for codigo_curso in sorted(self.alumno_a_cursos.get(codigo_alumno, ())):
+                curso = self.cursos[codigo_curso]
+                cursos_matriculado.append(f"{curso.codigo} - {curso.nombre}")
             
             if cursos_matriculado:
                 print("Cursos matriculados:")
@@ -332,12 +677,14 @@ class SDNController:
     
     def crear_alumno(self, nombre: str, codigo: str, mac: str) -> bool:
         """Crea un nuevo alumno"""
+        codigo = _clave(codigo)
         if codigo in self.alumnos:
             print(f"Ya existe un alumno con código {codigo}")
             return False
         
         alumno = Alumno(nombre, codigo, mac)
         self.alumnos[codigo] = alumno
+        self.alumno_a_cursos.setdefault(codigo, set())
         print(f"Alumno {nombre} creado correctamente.")
         return True
     
@@ -345,15 +692,11 @@ class SDNController:
         """Lista todos los cursos o los que brindan un servicio específico"""
         if servicio_nombre and servidor_nombre:
             print(f"\nCursos que tienen acceso al servicio {servicio_nombre} en {servidor_nombre}:")
-            for codigo, curso in self.cursos.items():
-                for srv, servicios_permitidos in curso.servidores:
-                    if srv.nombre == servidor_nombre and servicio_nombre in servicios_permitidos:
-                        print(f"- {curso}")
-                        break
+            sys.stdout.write("".join(f"- {self.cursos[codigo]}\n"
+                                     for codigo in self._service_index.get((servidor_nombre, servicio_nombre), ())))
         else:
             print("\nLista de todos los cursos:")
-            for codigo, curso in self.cursos.items():
-                print(f"- {curso}")
+            sys.stdout.write("".join(f"- {curso}\n" for curso in self.cursos.values()))
     
     def mostrar_detalle_curso(self, codigo_curso: str) -> None:
         """Muestra los detalles de un curso específico"""
@@ -364,7 +707,7 @@ class SDNController:
             
             # Mostrar alumnos matriculados
             print("\nAlumnos matriculados:")
-            for codigo_alumno in curso.alumnos:
+            for codigo_alumno in sorted(curso.alumnos):
                 if codigo_alumno in self.alumnos:
                     alumno = self.alumnos[codigo_alumno]
                     print(f"- {alumno.nombre} ({codigo_alumno})")
@@ -373,9 +716,9 @@ class SDNController:
             
             # Mostrar servidores y servicios permitidos
             print("\nServidores y servicios permitidos:")
-            for srv, servicios_permitidos in curso.servidores:
+            for srv, servicios_permitidos in curso.servidores.values():
                 print(f"- {srv.nombre} ({srv.ip}):")
-                for servicio in servicios_permitidos:
+                for servicio in sorted(servicios_permitidos):
                     print(f"  - {servicio}")
         else:
             print(f"No se encontró ningún curso con código {codigo_curso}")
@@ -395,10 +738,14 @@ class SDNController:
         
         if accion.lower() == 'agregar':
             curso.agregar_alumno(codigo_alumno)
+            self.alumno_a_cursos[codigo_alumno].add(codigo_curso)
+            self._activar_curso_alumno(curso, codigo_alumno)
             print(f"Alumno {alumno.nombre} agregado al curso {curso.nombre}")
             return True
         elif accion.lower() == 'eliminar':
             curso.remover_alumno(codigo_alumno)
+            self.alumno_a_cursos[codigo_alumno].discard(codigo_curso)
+            self._desactivar_curso_alumno(curso, codigo_alumno)
             print(f"Alumno {alumno.nombre} eliminado del curso {curso.nombre}")
             return True
         else:
@@ -408,8 +755,7 @@ class SDNController:
     def listar_servidores(self) -> None:
         """Lista todos los servidores"""
         print("\nLista de servidores:")
-        for nombre, servidor in self.servidores.items():
-            print(f"- {servidor}")
+        sys.stdout.write("".join(f"- {servidor}\n" for servidor in self.servidores.values()))
     
     def mostrar_detalle_servidor(self, nombre_servidor: str) -> None:
         """Muestra los detalles de un servidor específico"""
@@ -425,6 +771,43 @@ class SDNController:
             print(f"No se encontró ningún servidor con nombre {nombre_servidor}")
     
     # Funciones para trabajar con conexiones
+    def _refresh_devices(self) -> bool:
+        """
+        Descarga de una sola vez la lista de dispositivos del controlador y
+        reconstruye la tabla MAC -> punto de conexión.
+        
+        Returns:
+            True si se pudo actualizar la tabla, False en caso contrario
+        """
+        url = f'http://{self.controller_ip}:{self.controller_port}/wm/device/'
+        # Se registra también si falla, para no reintentar en cada consulta con el controlador caído
+        self._devices_intento_ts = time.monotonic()
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            
+            if response.status_code != 200:
+                logger.error("Error al consultar la API: %s", response.status_code)
+                return False
+            
+            devices = _json_loads(response.content)
+            logger.info("Respuesta del controlador: %s dispositivos encontrados", len(devices))
+        except Exception as e:
+            logger.error("Error al obtener punto de conexión: %s", e)
+            return False
+        
+        puntos = {}
+        for device in devices:
+            ap = device.get('attachmentPoint', [])
+            if ap:
+                punto = (sys.intern(ap[0]['switchDPID']), ap[0]['port'])
+                for m in device.get('mac', []):
+                    puntos.setdefault(_norm_mac(m), punto)
+        
+        self._devices_cache = puntos
+        self._devices_faltantes.clear()
+        self._devices_ts = time.monotonic()
+        return True
+    
     def get_attachment_point(self, mac: str) -> Tuple[Optional[str], Optional[int]]:
         """
         Obtiene el punto de conexión de un host en la red SDN.
@@ -435,66 +818,43 @@ class SDNController:
         Returns:
             Tupla (DPID del switch, número de puerto)
         """
-        url = f'http://{self.controller_ip}:{self.controller_port}/wm/device/'
-        try:
-            print(f"Consultando punto de conexión para MAC: {mac}")
-            response = requests.get(url)
-            
-            if response.status_code == 200:
-                devices = response.json()
-                print(f"Respuesta del controlador: {len(devices)} dispositivos encontrados")
-                
-                for device in devices:
-                    device_macs = device.get('mac', [])
-                    # Normalizar formato de MAC para comparación
-                    if mac.lower().replace(':', '').replace('-', '') in [m.lower().replace(':', '').replace('-', '') for m in device_macs]:
-                        ap = device.get('attachmentPoint', [])
-                        if ap:
-                            dpid = ap[0]['switchDPID']
-                            port = ap[0]['port']
-                            print(f"Host con MAC {mac} está conectado al switch {dpid} en el puerto {port}")
-                            return dpid, port
-                
-                print(f"No se encontró punto de conexión para MAC: {mac}")
-            else:
-                print(f"Error al consultar la API: {response.status_code}")
-                
-        except Exception as e:
-            print(f"Error al obtener punto de conexión: {e}")
+        mac_norm = _norm_mac(mac)
+        
+        ahora = time.monotonic()
+        vigente = ahora - self._devices_ts < self.AP_CACHE_TTL
+        punto = self._devices_cache.get(mac_norm) if vigente else None
+        # Descargar de nuevo si la lista caducó o si la MAC no estaba y aún no se buscó en
+        # esta lista; una MAC ya buscada sin éxito espera a que la lista caduque
+        if (punto is None
+                and (not vigente or mac_norm not in self._devices_faltantes)
+                and ahora - self._devices_intento_ts >= self.AP_MISS_REFRESH):
+            logger.info("Consultando punto de conexión para MAC: %s", mac)
+            if self._refresh_devices():
+                punto = self._devices_cache.get(mac_norm)
+                if punto is None:
+                    logger.warning("No se encontró punto de conexión para MAC: %s", mac)
+        # Recordar la ausencia mientras la lista vigente sea la misma
+        if punto is None and time.monotonic() - self._devices_ts < self.AP_CACHE_TTL:
+            self._devices_faltantes.add(mac_norm)
+        
+        if punto:
+            dpid, port = punto
+            logger.info("Host con MAC %s está conectado al switch %s en el puerto %s", mac, dpid, port)
+            return dpid, port
         
         # En caso de simulación o error, devuelve valores según la topología
-        print("ADVERTENCIA: Usando punto de conexión simulado")
-        
-        mac_map = {
-            "aa:51:aa:ba:72:41": ("00:00:aa:51:aa:ba:72:41", 2),
-            "1a:74:72:3f:ef:44": ("00:00:1a:74:72:3f:ef:44", 2),
-            "fe:16:3e:2c:76:52": ("00:00:5e:c7:6e:c6:11:4c", 1),
-            "fa:16:3e:f4:1f:11": ("00:00:aa:51:aa:ba:72:41", 2),
-            "fe:16:3e:6c:cf:e4": ("00:00:f2:20:f9:45:4c:4e", 3),
-            "5e:c7:6e:c6:11:4c": ("00:00:5e:c7:6e:c6:11:4c", 2),
-            "fa:16:3e:cd:5b:bd": ("00:00:aa:51:aa:ba:72:41", 2),
-            "72:e0:80:7e:85:4c": ("00:00:72:e0:80:7e:85:4c", 2),
-            "fe:16:3e:d5:92:74": ("00:00:1a:74:72:3f:ef:44", 3),
-            "fa:16:3e:05:f4:08": ("00:00:5e:c7:6e:c6:11:4c", 1),
-            "fe:16:3e:ec:df:26": ("00:00:aa:51:aa:ba:72:41", 5),
-            "fa:16:3e:c4:a9:9d": ("00:00:f2:20:f9:45:4c:4e", 3),
-            "fa:16:3e:3f:1a:fd": ("00:00:5e:c7:6e:c6:11:4c", 3),
-            "fe:16:3e:84:34:52": ("00:00:5e:c7:6e:c6:11:4c", 3),
-            "fe:16:3e:dc:6e:fa": ("00:00:72:e0:80:7e:85:4c", 2),
-            "fa:16:3e:d6:a2:a3": ("00:00:1a:74:72:3f:ef:44", 3),
-            "fe:16:3e:d3:02:36": ("00:00:aa:51:aa:ba:72:41", 2),
-            "f2:20:f9:45:4c:4e": ("00:00:f2:20:f9:45:4c:4e", 3),
-            "fe:16:3e:8b:eb:df": ("00:00:72:e0:80:7e:85:4c", 2),
-        }
-        
-        # Normalizar formato de MAC para comparación
-        mac_norm = mac.lower().replace(':', '').replace('-', '')
-        for mac_key, attachment in mac_map.items():
-            if mac_norm in mac_key.lower().replace(':', '').replace('-', ''):
+        logger.warning("ADVERTENCIA: Usando punto de conexión simulado")
+        
+        attachment = _SIMULATED_MAC_MAP.get(mac_norm)
+        if attachment:
+            return attachment
+        # Coincidencia parcial, por si se indicó solo un fragmento de la MAC
+        for mac_key, attachment in _SIMULATED_MAC_MAP.items():
+            if mac_norm in mac_key:
                 return attachment
         
         # Si no tenemos información específica, usamos valores genéricos para evitar errores
-        return "00:00:5e:c7:6e:c6:11:4c", 3  # Valores genéricos para SW1, puerto 3
+        return sys.intern("00:00:5e:c7:6e:c6:11:4c"), 3  # Valores genéricos para SW1, puerto 3
     
     def get_route(self, src_dpid: str, src_port: int, dst_dpid: str, dst_port: int) -> List[Tuple[str, int]]:
         """
@@ -509,26 +869,39 @@ class SDNController:
         Returns:
             Lista de tuplas (switch_dpid, puerto_salida) que forma la ruta
         """
+        if time.monotonic() - self._route_cache_time > self.ROUTE_CACHE_TTL:
+            self._actualizar_topologia()
+        
+        # Los saltos intermedios solo dependen de los switches origen y destino;
+        # el puerto final se ajusta al del destino pedido
+        cached = self._route_cache.get((src_dpid, dst_dpid))
+        if cached:
+            path = list(cached)
+            path[-1] = (path[-1][0], dst_port)
+            return path
+        
         url = f'http://{self.controller_ip}:{self.controller_port}/wm/topology/route/{src_dpid}/{src_port}/{dst_dpid}/{dst_port}/json'
         try:
-            print(f"Calculando ruta: {src_dpid}:{src_port} -> {dst_dpid}:{dst_port}")
-            response = requests.get(url)
+            logger.info("Calculando ruta: %s:%s -> %s:%s", src_dpid, src_port, dst_dpid, dst_port)
+            response = self.session.get(url, timeout=self.timeout)
             
             if response.status_code == 200:
-                path_data = response.json()
-                path = [(hop['switch'], hop['port']) for hop in path_data]
-                print(f"Ruta calculada: {len(path)} saltos")
+                path_data = _json_loads(response.content)
+                path = [(sys.intern(hop['switch']), hop['port']) for hop in path_data]
+                logger.info("Ruta calculada: %s saltos", len(path))
                 for i, (sw, pt) in enumerate(path):
-                    print(f"  Salto {i+1}: Switch {sw}, Puerto {pt}")
+                    logger.info("  Salto %s: Switch %s, Puerto %s", i+1, sw, pt)
+                if path:
+                    self._route_cache[(src_dpid, dst_dpid)] = list(path)
                 return path
             else:
-                print(f"Error al calcular la ruta: {response.status_code}")
+                logger.error("Error al calcular la ruta: %s", response.status_code)
         
         except Exception as e:
-            print(f"Error al obtener la ruta: {e}")
+            logger.error("Error al obtener la ruta: %s", e)
         
         # En caso de simulación o error, devuelve una ruta simulada basada en la topología
-        print("ADVERTENCIA: Usando ruta simulada")
+        logger.warning("ADVERTENCIA: Usando ruta simulada")
         
         # Si son el mismo switch, la ruta es directa
         if src_dpid == dst_dpid:
@@ -539,6 +912,63 @@ class SDNController:
         # En un entorno real, se obtendría la ruta verdadera del controlador Floodlight
         return [(src_dpid, 1), (dst_dpid, dst_port)]
     
+    def _actualizar_topologia(self) -> None:
+        """
+        Descarga los enlaces de la topología y precalcula la ruta más corta entre
+        todos los pares de switches, ejecutando Dijkstra una vez desde cada origen.
+        """
+        self.invalidate_topology_cache()
+        
+        url = f'http://{self.controller_ip}:{self.controller_port}/wm/topology/links/json'
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code != 200:
+                logger.error("Error al consultar la topología: %s", response.status_code)
+                return
+            links = _json_loads(response.content)
+        except Exception as e:
+            logger.error("Error al obtener la topología: %s", e)
+            return
+        
+        # Grafo de adyacencia: switch -> [(switch_vecino, puerto_de_salida)]
+        vecinos = collections.defaultdict(list)
+        for link in links:
+            src = sys.intern(link['src-switch'])
+            dst = sys.intern(link['dst-switch'])
+            vecinos[src].append((dst, link['src-port']))
+            vecinos[dst].append((src, link['dst-port']))
+        
+        for origen in list(vecinos):
+            distancia = {origen: 0}
+            previo = {}  # Dict[switch, (switch_anterior, puerto_de_salida_del_anterior)]
+            heap = [(0, origen)]
+            while heap:
+                d, sw = heapq.heappop(heap)
+                if d > distancia[sw]:
+                    continue
+                for vecino, puerto in vecinos[sw]:
+                    if d + 1 < distancia.get(vecino, float('inf')):
+                        distancia[vecino] = d + 1
+                        previo[vecino] = (sw, puerto)
+                        heapq.heappush(heap, (d + 1, vecino))
+            
+            # Reconstruir la ruta hacia cada destino; el puerto final se completa en get_route
+            for destino in previo:
+                ruta = [(destino, None)]
+                sw = destino
+                while sw != origen:
+                    sw, puerto = previo[sw]
+                    ruta.append((sw, puerto))
+                ruta.reverse()
+                self._route_cache[(origen, destino)] = ruta
+        
+        logger.info("Topología actualizada: %s switches, %s rutas precalculadas", len(vecinos), len(self._route_cache))
+    
+    def invalidate_topology_cache(self) -> None:
+        """Descarta las rutas cacheadas, por ejemplo tras un cambio en la topología"""
+        self._route_cache.clear()
+        self._route_cache_time = time.monotonic()
+    
     def build_route(self, ruta: List[Tuple[str, int]], conexion: Conexion) -> bool:
         """
         Instala los flujos necesarios para habilitar la conectividad entre un alumno y un servicio.
@@ -551,21 +981,42 @@ class SDNController:
             True si se instalaron los flujos correctamente, False en caso contrario
         """
         if not ruta:
-            print("Error: La ruta está vacía, no se pueden instalar flujos")
+            logger.error("Error: La ruta está vacía, no se pueden instalar flujos")
             return False
         
         alumno_mac = conexion.alumno.mac
         servidor_ip = conexion.servidor.ip
-        servicio_protocolo = conexion.servicio.protocolo
-        servicio_puerto = conexion.servicio.puerto
         
-        # Lista para almacenar los IDs de los flujos instalados
-        flujos_instalados = []
+        # Campos que dependen solo de la conexión: se calculan una vez para toda la ruta
+        es_tcp = conexion.servicio.protocolo.upper() == "TCP"
+        proto_num = "6" if es_tcp else "17"  # TCP=6, UDP=17
+        dst_key = "tcp_dst" if es_tcp else "udp_dst"
+        src_key = "tcp_src" if es_tcp else "udp_src"
+        servicio_puerto = str(conexion.servicio.puerto)
+        
+        forward_base = {**_IPV4_FLOW_TEMPLATE, "eth_src": alumno_mac, "ipv4_dst": servidor_ip,
+                        "ip_proto": proto_num, dst_key: servicio_puerto}
+        reverse_base = {**_IPV4_FLOW_TEMPLATE, "eth_dst": alumno_mac, "ipv4_src": servidor_ip,
+                        "ip_proto": proto_num, src_key: servicio_puerto}
+        arp_forward_base = {**_ARP_FLOW_TEMPLATE, "eth_src": alumno_mac}
+        arp_reverse_base = {**_ARP_FLOW_TEMPLATE, "eth_dst": alumno_mac}
+        
+        # El puerto de entrada del primer switch es donde está conectado el alumno
+        _, alumno_puerto = self.get_attachment_point(alumno_mac)
+        
+        # Cada switch de la ruta recibe exactamente 4 flujos (IPv4 y ARP en ambos sentidos),
+        # así que las listas se reservan completas y se llenan por índice
+        total_flujos = _FLUJOS_POR_SWITCH * len(ruta)
+        # Nombres de los flujos instalados
+        flujos_instalados = [None] * total_flujos
+        # Todos los flujos de la ruta se envían juntos en una sola petición
+        lote_flujos = [None] * total_flujos
+        url = f'http://{self.controller_ip}:{self.controller_port}/wm/staticflowpusher/json'
         
         try:
             # Instalar flujos en cada switch de la ruta
             for i, (switch_dpid, out_port) in enumerate(ruta):
-                print(f"Instalando flujos en el switch {switch_dpid}, puerto de salida {out_port}")
+                logger.info("Instalando flujos en el switch %s, puerto de salida %s", switch_dpid, out_port)
                 
                 # Determinar puertos de entrada/salida
                 # Para el primer switch, el puerto de entrada es donde está conectado el alumno
@@ -573,105 +1024,97 @@ class SDNController:
                 in_port = None
                 
                 if i == 0:  # Primer switch (conectado al alumno)
-                    # El puerto de entrada es donde está conectado el alumno
-                    _, alumno_puerto = self.get_attachment_point(alumno_mac)
                     in_port = alumno_puerto
                 else:
                     # El puerto de entrada es el puerto por donde sale el switch anterior
                     in_port = ruta[i-1][1]
                 
-                # URL para instalar flujos
-                url = f'http://{self.controller_ip}:{self.controller_port}/wm/staticflowpusher/json'
+                in_port_s = str(in_port)
+                out_port_s = str(out_port)
                 
                 # 1. Flujo para tráfico desde alumno hacia servidor (forward)
-                flow_name_forward = f"flow_alumno_to_servidor_{conexion.id}_{switch_dpid}_{in_port}_{out_port}"
                 flow_forward = {
+                    **forward_base,
                     "switch": switch_dpid,
-                    "name": flow_name_forward,
-                    "cookie": "0",
-                    "priority": "32768",
-                    "in_port": str(in_port),
-                    "eth_src": alumno_mac,
-                    "eth_type": "0x0800",  # IPv4
-                    "ipv4_dst": servidor_ip,
-                    "ip_proto": "6" if servicio_protocolo.upper() == "TCP" else "17",  # TCP=6, UDP=17
-                    "tcp_dst" if servicio_protocolo.upper() == "TCP" else "udp_dst": str(servicio_puerto),
-                    "active": "true",
+                    "name": f"flow_alumno_to_servidor_{conexion.id}_{switch_dpid}_{in_port}_{out_port}",
+                    "in_port": in_port_s,
                     "actions": f"output={out_port}"
                 }
                 
                 # 2. Flujo para tráfico desde servidor hacia alumno (reverse)
-                flow_name_reverse = f"flow_servidor_to_alumno_{conexion.id}_{switch_dpid}_{out_port}_{in_port}"
                 flow_reverse = {
+                    **reverse_base,
                     "switch": switch_dpid,
-                    "name": flow_name_reverse,
-                    "cookie": "0",
-                    "priority": "32768",
-                    "in_port": str(out_port),
-                    "eth_dst": alumno_mac,
-                    "eth_type": "0x0800",  # IPv4
-                    "ipv4_src": servidor_ip,
-                    "ip_proto": "6" if servicio_protocolo.upper() == "TCP" else "17",  # TCP=6, UDP=17
-                    "tcp_src" if servicio_protocolo.upper() == "TCP" else "udp_src": str(servicio_puerto),
-                    "active": "true",
+                    "name": f"flow_servidor_to_alumno_{conexion.id}_{switch_dpid}_{out_port}_{in_port}",
+                    "in_port": out_port_s,
                     "actions": f"output={in_port}"
                 }
                 
                 # 3. Flujo para ARP desde alumno hacia servidor
-                flow_name_arp_forward = f"flow_arp_alumno_to_servidor_{conexion.id}_{switch_dpid}_{in_port}_{out_port}"
                 flow_arp_forward = {
+                    **arp_forward_base,
                     "switch": switch_dpid,
-                    "name": flow_name_arp_forward,
-                    "cookie": "0",
-                    "priority": "32768",
-                    "in_port": str(in_port),
-                    "eth_src": alumno_mac,
-                    "eth_type": "0x0806",  # ARP
-                    "active": "true",
+                    "name": f"flow_arp_alumno_to_servidor_{conexion.id}_{switch_dpid}_{in_port}_{out_port}",
+                    "in_port": in_port_s,
                     "actions": f"output={out_port}"
                 }
                 
                 # 4. Flujo para ARP desde servidor hacia alumno
-                flow_name_arp_reverse = f"flow_arp_servidor_to_alumno_{conexion.id}_{switch_dpid}_{out_port}_{in_port}"
                 flow_arp_reverse = {
+                    **arp_reverse_base,
                     "switch": switch_dpid,
-                    "name": flow_name_arp_reverse,
-                    "cookie": "0",
-                    "priority": "32768",
-                    "in_port": str(out_port),
-                    "eth_type": "0x0806",  # ARP
-                    "eth_dst": alumno_mac,
-                    "active": "true",
+                    "name": f"flow_arp_servidor_to_alumno_{conexion.id}_{switch_dpid}_{out_port}_{in_port}",
+                    "in_port": out_port_s,
                     "actions": f"output={in_port}"
                 }
                 
-                # Instalar los flujos en el switch
-                # En un entorno real, usaríamos requests.post() para cada flujo
-                print(f"Instalando flujo: {flow_name_forward}")
-                # response = requests.post(url, json=flow_forward)
-                flujos_instalados.append(flow_name_forward)
-                
-                print(f"Instalando flujo: {flow_name_reverse}")
-                # response = requests.post(url, json=flow_reverse)
-                flujos_instalados.append(flow_name_reverse)
-                
-                print(f"Instalando flujo ARP: {flow_name_arp_forward}")
-                # response = requests.post(url, json=flow_arp_forward)
-                flujos_instalados.append(flow_arp_forward)
-                
-                print(f"Instalando flujo ARP: {flow_name_arp_reverse}")
-                # response = requests.post(url, json=flow_arp_reverse)
-                flujos_instalados.append(flow_arp_reverse)
+                base = i * _FLUJOS_POR_SWITCH
+                for j, flow in enumerate((flow_forward, flow_reverse, flow_arp_forward, flow_arp_reverse), base):
+                    lote_flujos[j] = flow
+                    flujos_instalados[j] = flow["name"]
+            
+            # Instalar todos los flujos de la ruta en una sola petición al controlador
+            logger.info("Enviando %s flujos al controlador...", len(lote_flujos))
+            try:
+                response = self.session.post(url, data=_json_dumps(lote_flujos), timeout=self.timeout)
+                if response.status_code != 200:
+                    logger.error("Error al instalar los flujos: %s", response.status_code)
+                    # El controlador pudo aplicar parte del lote: deshacer lo instalado
+                    logger.info("Revirtiendo los flujos enviados...")
+                    self._borrar_flujos_controlador(flujos_instalados)
+                    return False
+                logger.info("Respuesta del controlador: %s", response.status_code)
+            except requests.exceptions.RequestException as e:
+                logger.warning("ADVERTENCIA: No se pudo contactar al controlador (%s), flujos registrados solo localmente", e)
             
-            # Registrar los flujos instalados para esta conexión
-            self.conexion_flujos[conexion.id] = flujos_instalados
-            print(f"Se instalaron {len(flujos_instalados)} flujos para la conexión {conexion.id}")
+            # Registrar los flujos instalados para esta conexión (ya no cambian)
+            self.conexion_flujos[conexion.id] = tuple(flujos_instalados)
+            logger.info("Se instalaron %s flujos para la conexión %s", len(flujos_instalados), conexion.id)
             return True
             
         except Exception as e:
-            print(f"Error al instalar los flujos: {e}")
+            logger.error("Error al instalar los flujos: %s", e)
             return False
     
+    def _borrar_flujos_controlador(self, flujos: Sequence[str]) -> bool:
+        """
+        Elimina en el controlador, con una sola petición, los flujos indicados por nombre.
+        
+        Returns:
+            False si el controlador rechazó la petición, True en caso contrario
+        """
+        url = f'http://{self.controller_ip}:{self.controller_port}/wm/staticflowpusher/json'
+        payload = [{"name": flow_name} for flow_name in flujos]
+        logger.info("Eliminando %s flujos en el controlador...", len(payload))
+        try:
+            response = self.session.delete(url, data=_json_dumps(payload), timeout=self.timeout)
+            if response.status_code != 200:
+                logger.error("Error al eliminar los flujos: %s", response.status_code)
+                return False
+        except requests.exceptions.RequestException as e:
+            logger.warning("ADVERTENCIA: No se pudo contactar al controlador (%s), flujos eliminados solo localmente", e)
+        return True
+    
     def eliminar_flujos(self, id_conexion: str) -> bool:
         """
         Elimina todos los flujos instalados para una conexión específica.
@@ -682,27 +1125,23 @@ class SDNController:
         Returns:
             True si se eliminaron los flujos correctamente, False en caso contrario
         """
-        if id_conexion not in self.conexion_flujos:
-            print(f"No hay flujos registrados para la conexión {id_conexion}")
+        # Se retira el registro de una vez; si el borrado falla se vuelve a guardar
+        flujos = self.conexion_flujos.pop(id_conexion, None)
+        if flujos is None:
+            logger.warning("No hay flujos registrados para la conexión %s", id_conexion)
             return False
         
-        flujos = self.conexion_flujos[id_conexion]
-        url = f'http://{self.controller_ip}:{self.controller_port}/wm/staticflowpusher/json'
-        
         try:
-            for flow_name in flujos:
-                print(f"Eliminando flujo: {flow_name}")
-                # En un entorno real, usaríamos:
-                # delete_data = {"name": flow_name}
-                # response = requests.delete(url, json=delete_data)
+            if not self._borrar_flujos_controlador(flujos):
+                self.conexion_flujos[id_conexion] = flujos
+                return False
             
-            # Eliminar el registro de los flujos
-            del self.conexion_flujos[id_conexion]
-            print(f"Se eliminaron {len(flujos)} flujos para la conexión {id_conexion}")
+            logger.info("Se eliminaron %s flujos para la conexión %s", len(flujos), id_conexion)
             return True
             
         except Exception as e:
-            print(f"Error al eliminar los flujos: {e}")
+            self.conexion_flujos[id_conexion] = flujos
+            logger.error("Error al eliminar los flujos: %s", e)
             return False
     
     def crear_conexion(self, codigo_alumno: str, nombre_servidor: str, nombre_servicio: str) -> bool:
@@ -731,37 +1170,19 @@ class SDNController:
         servidor = self.servidores[nombre_servidor]
         
         # Buscar el servicio en el servidor
-        servicio = None
-        for svc in servidor.servicios:
-            if svc.nombre.lower() == nombre_servicio.lower():
-                servicio = svc
-                break
+        servicio = servidor.servicios_by_name.get(nombre_servicio.casefold())
         
         if not servicio:
             print(f"El servidor {nombre_servidor} no ofrece el servicio {nombre_servicio}")
             return False
         
-        # Verificar autorización
-        autorizado = False
-        curso_autorizador = None
-        
-        for codigo_curso, curso in self.cursos.items():
-            if curso.estado != "DICTANDO":
-                continue
-            
-            if codigo_alumno not in curso.alumnos:
-                continue
-            
-            for srv, servicios_permitidos in curso.servidores:
-                if srv.nombre == servidor.nombre and servicio.nombre.lower() in [s.lower() for s in servicios_permitidos]:
-                    autorizado = True
-                    curso_autorizador = curso
-                    break
-            
-            if autorizado:
-                break
+        # Verificar autorización: algún curso DICTANDO del alumno debe permitir el servicio
+        curso_autorizador = self.auth_index.get((codigo_alumno, servidor.nombre, servicio._nombre_cf))
         
-        if not autorizado:
+        # El curso del índice debe seguir registrado con ese código y en estado DICTANDO
+        if (not curso_autorizador
+                or self.cursos.get(curso_autorizador.codigo) is not curso_autorizador
+                or curso_autorizador.estado != "DICTANDO"):
             print(f"El alumno {alumno.nombre} no está autorizado para acceder al servicio {nombre_servicio} en {nombre_servidor}")
             return False
         
@@ -770,36 +1191,37 @@ class SDNController:
         self.conexiones[conexion.id] = conexion
         
         print(f"Conexión creada: {conexion}")
-        print(f"Autorizado por curso: {curso_autorizador.codigo} - {curso_autorizador.nombre}")
+        logger.info("Autorizado por curso: %s - %s", curso_autorizador.codigo, curso_autorizador.nombre)
         
         # Configurar la ruta en la red SDN utilizando Floodlight
-        print("\nConfigurando la ruta en la red SDN...")
+        logger.info("\nConfigurando la ruta en la red SDN...")
         
-        # 1. Obtener punto de conexión del alumno
+        # 1 y 2. Obtener los puntos de conexión del alumno y del servidor.
+        # Ambos salen de la misma tabla de dispositivos, que se descarga una sola vez.
+        # El del servidor se simula: en un entorno real se obtendría de la red.
+        servidor_mac = "fa:16:3e:6c:a0:7c"  # MAC simulada para el servidor
         alumno_dpid, alumno_port = self.get_attachment_point(alumno.mac)
+        servidor_dpid, servidor_port = self.get_attachment_point(servidor_mac)
+        
         if not alumno_dpid or not alumno_port:
-            print(f"ERROR: No se pudo determinar el punto de conexión del alumno con MAC {alumno.mac}")
+            logger.error("ERROR: No se pudo determinar el punto de conexión del alumno con MAC %s", alumno.mac)
             # Eliminar la conexión creada
             del self.conexiones[conexion.id]
             return False
         
-        # 2. Obtener punto de conexión del servidor (simulado)
-        # En un entorno real, esto se obtendría de la red, aquí lo simulamos
-        servidor_mac = "fa:16:3e:6c:a0:7c"  # MAC simulada para el servidor
-        servidor_dpid, servidor_port = self.get_attachment_point(servidor_mac)
         if not servidor_dpid or not servidor_port:
-            print(f"ERROR: No se pudo determinar el punto de conexión del servidor con IP {servidor.ip}")
+            logger.error("ERROR: No se pudo determinar el punto de conexión del servidor con IP %s", servidor.ip)
             # Eliminar la conexión creada
             del self.conexiones[conexion.id]
             return False
         
-        print(f"Punto de conexión del alumno: Switch {alumno_dpid}, Puerto {alumno_port}")
-        print(f"Punto de conexión del servidor: Switch {servidor_dpid}, Puerto {servidor_port}")
+        logger.info("Punto de conexión del alumno: Switch %s, Puerto %s", alumno_dpid, alumno_port)
+        logger.info("Punto de conexión del servidor: Switch %s, Puerto %s", servidor_dpid, servidor_port)
         
         # 3. Calcular la ruta entre los dos puntos
         ruta = self.get_route(alumno_dpid, alumno_port, servidor_dpid, servidor_port)
         if not ruta:
-            print("ERROR: No se pudo calcular una ruta entre el alumno y el servidor")
+            logger.error("ERROR: No se pudo calcular una ruta entre el alumno y el servidor")
             # Eliminar la conexión creada
             del self.conexiones[conexion.id]
             return False
@@ -809,11 +1231,13 @@ class SDNController:
         
         # 4. Instalar los flujos necesarios para permitir la comunicación
         if not self.build_route(ruta, conexion):
-            print("ERROR: No se pudieron instalar los flujos necesarios")
+            logger.error("ERROR: No se pudieron instalar los flujos necesarios")
             # Eliminar la conexión creada
             del self.conexiones[conexion.id]
             return False
         
+        # Las respuestas al usuario van con print: antes se escriben los mensajes ya encolados
+        _esperar_logs()
         print(f"Conexión {conexion.id} configurada correctamente en la red SDN")
         return True
     
@@ -827,21 +1251,25 @@ class SDNController:
         Returns:
             True si se eliminó la conexión correctamente, False en caso contrario
         """
-        if id_conexion not in self.conexiones:
+        conexion = self.conexiones.pop(id_conexion, None)
+        if conexion is None:
             print(f"No se encontró ninguna conexión con ID {id_conexion}")
             return False
         
-        conexion = self.conexiones[id_conexion]
-        print(f"Eliminando conexión {id_conexion}: {conexion}")
+        logger.info("Eliminando conexión %s: %s", id_conexion, conexion)
         
         # Eliminar los flujos configurados para esta conexión
-        if id_conexion in self.conexion_flujos:
-            print(f"Eliminando {len(self.conexion_flujos[id_conexion])} flujos...")
+        flujos = self.conexion_flujos.get(id_conexion)
+        if flujos is not None:
+            logger.info("Eliminando %s flujos...", len(flujos))
             if not self.eliminar_flujos(id_conexion):
-                print("ADVERTENCIA: No se pudieron eliminar todos los flujos")
+                # Los flujos siguen instalados: se conserva la conexión para poder reintentar
+                self.conexiones[id_conexion] = conexion
+                _esperar_logs()
+                print(f"No se pudieron eliminar los flujos; la conexión {id_conexion} se mantiene")
+                return False
         
-        # Eliminar la conexión
-        del self.conexiones[id_conexion]
+        _esperar_logs()
         print(f"Conexión {id_conexion} eliminada correctamente")
         
         return True
@@ -852,81 +1280,329 @@ class SDNController:
             print("No hay conexiones activas.")
             return
         
-        print("\nConexiones activas:")
-        print(f"{'ID':<10} {'Alumno':<20} {'Servidor':<15} {'Servicio':<10}")
-        print("-" * 55)
-        
-        for id_conexion, conexion in self.conexiones.items():
-            print(f"{id_conexion:<10} {conexion.alumno.nombre:<20} {conexion.servidor.nombre:<15} {conexion.servicio.nombre:<10}")
-            
-        print(f"\nTotal: {len(self.conexiones)} conexiones")
+        # La tabla completa se arma en memoria y se escribe con una sola llamada
+        filas = [
+            "\nConexiones activas:",
+            f"{'ID':<10} {'Alumno':<20} {'Servidor':<15} {'Servicio':<10}",
+            "-" * 55,
+        ]
+        filas.extend(
+            f"{id_conexion:<10} {conexion.alumno.nombre:<20} {conexion.servidor.nombre:<15} {conexion.servicio.nombre:<10}"
+            for id_conexion, conexion in self.conexiones.items()
+        )
+        filas.append(f"\nTotal: {len(self.conexiones)} conexiones\n")
+        sys.stdout.write("\n".join(filas))
+
+
+# Cada menú se arma una sola vez y se escribe en pantalla con una única llamada
+_MENU_PRINCIPAL = (
+    "\n"
+    "============================================================\n"
+    "      🌐 Network Policy Manager - UPSM SDN Controller 🌐\n"
+    "============================================================\n"
+    "\n"
+    "¿Qué deseas hacer?\n"
+    "  1️⃣  Importar datos desde archivo YAML\n"
+    "  2️⃣  Exportar datos a archivo YAML\n"
+    "  3️⃣  Gestionar cursos\n"
+    "  4️⃣  Gestionar alumnos\n"
+    "  5️⃣  Gestionar servidores\n"
+    "  6️⃣  Políticas de acceso (próximamente)\n"
+    "  7️⃣  Gestionar conexiones SDN\n"
+    "  8️⃣  Salir del programa\n"
+    "\n"
+    "Selecciona una opción (1-8): "
+)
+
+_MENU_IMPORTAR = (
+    "\n"
+    "📥 Importar datos\n"
+    "Escribe el nombre del archivo YAML a importar (o 'b' para volver):\n"
+    ">>> "
+)
+
+_MENU_EXPORTAR = (
+    "\n"
+    "📤 Exportar datos\n"
+    "Escribe el nombre del archivo YAML a exportar (o 'b' para volver):\n"
+    ">>> "
+)
+
+_MENU_CURSOS = (
+    "\n"
+    "📚 Menú de Cursos\n"
+    "  1) Crear curso (no implementado)\n"
+    "  2) Listar cursos\n"
+    "  3) Ver detalles de un curso\n"
+    "  4) Agregar/eliminar alumno en curso\n"
+    "  5) Borrar curso (no implementado)\n"
+    "  b) Volver al menú principal\n"
+    "\n"
+    "Selecciona una opción: "
+)
+
+_MENU_ALUMNOS = (
+    "\n"
+    "👨\u200d🎓 Menú de Alumnos\n"
+    "  1) Crear alumno (no implementado)\n"
+    "  2) Listar alumnos\n"
+    "  3) Ver detalles de un alumno\n"
+    "  4) Actualizar alumno (no implementado)\n"
+    "  5) Borrar alumno (no implementado)\n"
+    "  b) Volver al menú principal\n"
+    "\n"
+    "Selecciona una opción: "
+)
+
+_MENU_SERVIDORES = (
+    "\n"
+    "🖥️ Menú de Servidores\n"
+    "  1) Crear servidor (no implementado)\n"
+    "  2) Listar servidores\n"
+    "  3) Ver detalles de un servidor\n"
+    "  4) Actualizar servidor (no implementado)\n"
+    "  5) Borrar servidor (no implementado)\n"
+    "  b) Volver al menú principal\n"
+    "\n"
+    "Selecciona una opción: "
+)
+
+_MENU_CONEXIONES = (
+    "\n"
+    "🔗 Menú de Conexiones SDN\n"
+    "  1) Crear conexión (instalar ruta)\n"
+    "  2) Listar conexiones activas\n"
+    "  3) Ver detalle de conexión (no implementado)\n"
+    "  4) Recalcular ruta (no implementado)\n"
+    "  5) Actualizar conexión (no implementado)\n"
+    "  6) Borrar conexión\n"
+    "  b) Volver al menú principal\n"
+    "\n"
+    "Selecciona una opción: "
+)
 
 
 def mostrar_menu_principal():
-    print("\n" + "=" * 60)
-    print("      🌐 Network Policy Manager - UPSM SDN Controller 🌐")
-    print("=" * 60)
-    print("\n¿Qué deseas hacer?")
-    print("  1️⃣  Importar datos desde archivo YAML")
-    print("  2️⃣  Exportar datos a archivo YAML")
-    print("  3️⃣  Gestionar cursos")
-    print("  4️⃣  Gestionar alumnos")
-    print("  5️⃣  Gestionar servidores")
-    print("  6️⃣  Políticas de acceso (próximamente)")
-    print("  7️⃣  Gestionar conexiones SDN")
-    print("  8️⃣  Salir del programa")
-    print("\nSelecciona una opción (1-8): ", end="")
+    sys.stdout.write(_MENU_PRINCIPAL)
 
 def mostrar_menu_importar():
-    print("\n📥 Importar datos")
-    print("Escribe el nombre del archivo YAML a importar (o 'b' para volver):")
-    print(">>> ", end="")
+    sys.stdout.write(_MENU_IMPORTAR)
 
 def mostrar_menu_exportar():
-    print("\n📤 Exportar datos")
-    print("Escribe el nombre del archivo YAML a exportar (o 'b' para volver):")
-    print(">>> ", end="")
+    sys.stdout.write(_MENU_EXPORTAR)
 
 def mostrar_menu_cursos():
-    print("\n📚 Menú de Cursos")
-    print("  1) Crear curso (no implementado)")
-    print("  2) Listar cursos")
-    print("  3) Ver detalles de un curso")
-    print("  4) Agregar/eliminar alumno en curso")
-    print("  5) Borrar curso (no implementado)")
-    print("  b) Volver al menú principal")
-    print("\nSelecciona una opción: ", end="")
+    sys.stdout.write(_MENU_CURSOS)
 
 def mostrar_menu_alumnos():
-    print("\n👨‍🎓 Menú de Alumnos")
-    print("  1) Crear alumno (no implementado)")
-    print("  2) Listar alumnos")
-    print("  3) Ver detalles de un alumno")
-    print("  4) Actualizar alumno (no implementado)")
-    print("  5) Borrar alumno (no implementado)")
-    print("  b) Volver al menú principal")
-    print("\nSelecciona una opción: ", end="")
+    sys.stdout.write(_MENU_ALUMNOS)
 
 def mostrar_menu_servidores():
-    print("\n🖥️ Menú de Servidores")
-    print("  1) Crear servidor (no implementado)")
-    print("  2) Listar servidores")
-    print("  3) Ver detalles de un servidor")
-    print("  4) Actualizar servidor (no implementado)")
-    print("  5) Borrar servidor (no implementado)")
-    print("  b) Volver al menú principal")
-    print("\nSelecciona una opción: ", end="")
+    sys.stdout.write(_MENU_SERVIDORES)
 
 def mostrar_menu_conexiones():
-    print("\n🔗 Menú de Conexiones SDN")
-    print("  1) Crear conexión (instalar ruta)")
-    print("  2) Listar conexiones activas")
-    print("  3) Ver detalle de conexión (no implementado)")
-    print("  4) Recalcular ruta (no implementado)")
-    print("  5) Actualizar conexión (no implementado)")
-    print("  6) Borrar conexión")
-    print("  b) Volver al menú principal")
-    print("\nSelecciona una opción: ", end="")
+    sys.stdout.write(_MENU_CONEXIONES)
+
+
+def _no_implementado(controller):
+    print("Funcionalidad no implementada")
+
+
+def _ejecutar_submenu(controller, mostrar, acciones):
+    """Repite un submenú despachando cada opción a su manejador hasta que se elija 'b'"""
+    while True:
+        mostrar()
+        opcion = input().strip()
+        accion = acciones.get(opcion)
+        if accion is not None:
+            accion(controller)
+            # Que los mensajes de la operación salgan antes de volver a mostrar el menú
+            _esperar_logs()
+        elif opcion.lower() == 'b':
+            break
+        else:
+            print("Opción no válida")
+
+
+# Manejadores del menú de cursos
+
+def _listar_cursos(controller):
+    print("\n¿Desea listar todos los cursos o filtrar por servicio y servidor? (t/f):")
+    filtrar = input().strip().lower() == 'f'
+    
+    if filtrar:
+        print("Ingrese el nombre del servicio:")
+        servicio = input().strip()
+        print("Ingrese el nombre del servidor:")
+        servidor = input().strip()
+        controller.listar_cursos(servicio, servidor)
+    else:
+        controller.listar_cursos()
+
+
+def _detalle_curso(controller):
+    print("Ingrese el código del curso:")
+    codigo = input().strip()
+    controller.mostrar_detalle_curso(codigo)
+
+
+def _actualizar_curso(controller):
+    print("Ingrese el código del curso:")
+    codigo_curso = input().strip()
+    print("Ingrese el código del alumno:")
+    codigo_alumno = input().strip()
+    print("¿Desea agregar o eliminar al alumno? (a/e):")
+    accion = 'agregar' if input().strip().lower() == 'a' else 'eliminar'
+    controller.actualizar_curso(codigo_curso, codigo_alumno, accion)
+
+
+_ACCIONES_CURSOS = {
+    '1': _no_implementado,    # Crear
+    '2': _listar_cursos,      # Listar
+    '3': _detalle_curso,      # Mostrar detalle
+    '4': _actualizar_curso,   # Actualizar
+    '5': _no_implementado,    # Borrar
+}
+
+
+# Manejadores del menú de alumnos
+
+def _crear_alumno(controller):
+    print("Ingrese el nombre del alumno:")
+    nombre = input().strip()
+    print("Ingrese el código del alumno:")
+    codigo = input().strip()
+    print("Ingrese la MAC del alumno:")
+    mac = input().strip()
+    controller.crear_alumno(nombre, codigo, mac)
+
+
+def _listar_alumnos(controller):
+    print("\n¿Desea listar todos los alumnos o filtrar por curso? (t/c):")
+    filtrar = input().strip().lower() == 'c'
+    
+    if filtrar:
+        print("Ingrese el código del curso:")
+        codigo_curso = input().strip()
+        controller.listar_alumnos(codigo_curso)
+    else:
+        controller.listar_alumnos()
+
+
+def _detalle_alumno(controller):
+    print("Ingrese el código del alumno:")
+    codigo = input().strip()
+    controller.mostrar_detalle_alumno(codigo)
+
+
+_ACCIONES_ALUMNOS = {
+    '1': _crear_alumno,       # Crear
+    '2': _listar_alumnos,     # Listar
+    '3': _detalle_alumno,     # Mostrar detalle
+    '4': _no_implementado,    # Actualizar
+    '5': _no_implementado,    # Borrar
+}
+
+
+# Manejadores del menú de servidores
+
+def _listar_servidores(controller):
+    controller.listar_servidores()
+
+
+def _detalle_servidor(controller):
+    print("Ingrese el nombre del servidor:")
+    nombre = input().strip()
+    controller.mostrar_detalle_servidor(nombre)
+
+
+_ACCIONES_SERVIDORES = {
+    '1': _no_implementado,    # Crear
+    '2': _listar_servidores,  # Listar
+    '3': _detalle_servidor,   # Mostrar detalle
+    '4': _no_implementado,    # Actualizar
+    '5': _no_implementado,    # Borrar
+}
+
+
+# Manejadores del menú de conexiones
+
+def _crear_conexion(controller):
+    print("Ingrese el código del alumno:")
+    codigo_alumno = input().strip()
+    print("Ingrese el nombre del servidor:")
+    nombre_servidor = input().strip()
+    print("Ingrese el nombre del servicio:")
+    nombre_servicio = input().strip()
+    controller.crear_conexion(codigo_alumno, nombre_servidor, nombre_servicio)
+
+
+def _listar_conexiones(controller):
+    controller.listar_conexiones()
+
+
+def _borrar_conexion(controller):
+    print("Ingrese el ID de la conexión a borrar:")
+    id_conexion = input().strip()
+    controller.borrar_conexion(id_conexion)
+
+
+_ACCIONES_CONEXIONES = {
+    '1': _crear_conexion,     # Crear
+    '2': _listar_conexiones,  # Listar
+    '3': _no_implementado,    # Mostrar detalle
+    '4': _no_implementado,    # Recalcular
+    '5': _no_implementado,    # Actualizar
+    '6': _borrar_conexion,    # Borrar
+}
+
+
+# Manejadores del menú principal
+
+def _importar(controller):
+    mostrar_menu_importar()
+    ruta_archivo = input().strip()
+    if ruta_archivo.lower() != 'b':
+        controller.importar_archivo(ruta_archivo)
+
+
+def _exportar(controller):
+    mostrar_menu_exportar()
+    ruta_archivo = input().strip()
+    if ruta_archivo.lower() != 'b':
+        controller.exportar_archivo(ruta_archivo)
+
+
+def _menu_cursos(controller):
+    _ejecutar_submenu(controller, mostrar_menu_cursos, _ACCIONES_CURSOS)
+
+
+def _menu_alumnos(controller):
+    _ejecutar_submenu(controller, mostrar_menu_alumnos, _ACCIONES_ALUMNOS)
+
+
+def _menu_servidores(controller):
+    _ejecutar_submenu(controller, mostrar_menu_servidores, _ACCIONES_SERVIDORES)
+
+
+def _menu_politicas(controller):
+    print("Menú de políticas no implementado")
+
+
+def _menu_conexiones(controller):
+    _ejecutar_submenu(controller, mostrar_menu_conexiones, _ACCIONES_CONEXIONES)
+
+
+# Tabla de despacho del menú principal: opción -> manejador
+_ACCIONES_PRINCIPAL = {
+    '1': _importar,           # Importar
+    '2': _exportar,           # Exportar
+    '3': _menu_cursos,        # Cursos
+    '4': _menu_alumnos,       # Alumnos
+    '5': _menu_servidores,    # Servidores
+    '6': _menu_politicas,     # Políticas
+    '7': _menu_conexiones,    # Conexiones
+}
 
 
 def menu(controller):
@@ -935,181 +1611,44 @@ def menu(controller):
         mostrar_menu_principal()
         opcion = input().strip()
         
-        if opcion == '1':  # Importar
-            mostrar_menu_importar()
-            ruta_archivo = input().strip()
-            if ruta_archivo.lower() != 'b':
-                controller.importar_archivo(ruta_archivo)
-        
-        elif opcion == '2':  # Exportar
-            mostrar_menu_exportar()
-            ruta_archivo = input().strip()
-            if ruta_archivo.lower() != 'b':
-                controller.exportar_archivo(ruta_archivo)
-        
-        elif opcion == '3':  # Cursos
-            while True:
-                mostrar_menu_cursos()
-                opcion_curso = input().strip()
-                
-                if opcion_curso == '1':  # Crear
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_curso == '2':  # Listar
-                    print("\n¿Desea listar todos los cursos o filtrar por servicio y servidor? (t/f):")
-                    filtrar = input().strip().lower() == 'f'
-                    
-                    if filtrar:
-                        print("Ingrese el nombre del servicio:")
-                        servicio = input().strip()
-                        print("Ingrese el nombre del servidor:")
-                        servidor = input().strip()
-                        controller.listar_cursos(servicio, servidor)
-                    else:
-                        controller.listar_cursos()
-                
-                elif opcion_curso == '3':  # Mostrar detalle
-                    print("Ingrese el código del curso:")
-                    codigo = input().strip()
-                    controller.mostrar_detalle_curso(codigo)
-                
-                elif opcion_curso == '4':  # Actualizar
-                    print("Ingrese el código del curso:")
-                    codigo_curso = input().strip()
-                    print("Ingrese el código del alumno:")
-                    codigo_alumno = input().strip()
-                    print("¿Desea agregar o eliminar al alumno? (a/e):")
-                    accion = 'agregar' if input().strip().lower() == 'a' else 'eliminar'
-                    controller.actualizar_curso(codigo_curso, codigo_alumno, accion)
-                
-                elif opcion_curso == '5':  # Borrar
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_curso.lower() == 'b':
-                    break
-                
-                else:
-                    print("Opción no válida")
-        
-        elif opcion == '4':  # Alumnos
-            while True:
-                mostrar_menu_alumnos()
-                opcion_alumno = input().strip()
-                
-                if opcion_alumno == '1':  # Crear
-                    print("Ingrese el nombre del alumno:")
-                    nombre = input().strip()
-                    print("Ingrese el código del alumno:")
-                    codigo = input().strip()
-                    print("Ingrese la MAC del alumno:")
-                    mac = input().strip()
-                    controller.crear_alumno(nombre, codigo, mac)
-                
-                elif opcion_alumno == '2':  # Listar
-                    print("\n¿Desea listar todos los alumnos o filtrar por curso? (t/c):")
-                    filtrar = input().strip().lower() == 'c'
-                    
-                    if filtrar:
-                        print("Ingrese el código del curso:")
-                        codigo_curso = input().strip()
-                        controller.listar_alumnos(codigo_curso)
-                    else:
-                        controller.listar_alumnos()
-                
-                elif opcion_alumno == '3':  # Mostrar detalle
-                    print("Ingrese el código del alumno:")
-                    codigo = input().strip()
-                    controller.mostrar_detalle_alumno(codigo)
-                
-                elif opcion_alumno == '4':  # Actualizar
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_alumno == '5':  # Borrar
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_alumno.lower() == 'b':
-                    break
-                
-                else:
-                    print("Opción no válida")
-        
-        elif opcion == '5':  # Servidores
-            while True:
-                mostrar_menu_servidores()
-                opcion_servidor = input().strip()
-                
-                if opcion_servidor == '1':  # Crear
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_servidor == '2':  # Listar
-                    controller.listar_servidores()
-                
-                elif opcion_servidor == '3':  # Mostrar detalle
-                    print("Ingrese el nombre del servidor:")
-                    nombre = input().strip()
-                    controller.mostrar_detalle_servidor(nombre)
-                
-                elif opcion_servidor == '4':  # Actualizar
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_servidor == '5':  # Borrar
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_servidor.lower() == 'b':
-                    break
-                
-                else:
-                    print("Opción no válida")
-        
-        elif opcion == '6':  # Políticas
-            print("Menú de políticas no implementado")
-        
-        elif opcion == '7':  # Conexiones
-            while True:
-                mostrar_menu_conexiones()
-                opcion_conexion = input().strip()
-                
-                if opcion_conexion == '1':  # Crear
-                    print("Ingrese el código del alumno:")
-                    codigo_alumno = input().strip()
-                    print("Ingrese el nombre del servidor:")
-                    nombre_servidor = input().strip()
-                    print("Ingrese el nombre del servicio:")
-                    nombre_servicio = input().strip()
-                    controller.crear_conexion(codigo_alumno, nombre_servidor, nombre_servicio)
-                
-                elif opcion_conexion == '2':  # Listar
-                    controller.listar_conexiones()
-                
-                elif opcion_conexion == '3':  # Mostrar detalle
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_conexion == '4':  # Recalcular
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_conexion == '5':  # Actualizar
-                    print("Funcionalidad no implementada")
-                
-                elif opcion_conexion == '6':  # Borrar
-                    print("Ingrese el ID de la conexión a borrar:")
-                    id_conexion = input().strip()
-                    controller.borrar_conexion(id_conexion)
-                
-                elif opcion_conexion.lower() == 'b':
-                    break
-                
-                else:
-                    print("Opción no válida")
-        
+        accion = _ACCIONES_PRINCIPAL.get(opcion)
+        if accion is not None:
+            accion(controller)
+            # Que los mensajes de la operación salgan antes de volver a mostrar el menú
+            _esperar_logs()
         elif opcion == '8':  # Salir
             print("¡Hasta luego!")
             break
-        
         else:
             print("Opción no válida")
 
 
+def _configurar_logging() -> logging.handlers.QueueListener:
+    """
+    Configura el logger "sdn" para que sus mensajes se encolen y un hilo aparte
+    los escriba en pantalla. El nivel se toma de la variable de entorno LOG_LEVEL.
+    """
+    nivel = os.environ.get("LOG_LEVEL", "INFO").upper()
+    if not isinstance(logging.getLevelName(nivel), int):
+        print(f"ADVERTENCIA: LOG_LEVEL={nivel} no es válido, se usará INFO")
+        nivel = "INFO"
+    
+    global _cola_logs
+    cola = _cola_logs = queue.Queue(-1)
+    salida = logging.StreamHandler(sys.stdout)
+    salida.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(cola, salida)
+    
+    logger.addHandler(logging.handlers.QueueHandler(cola))
+    logger.setLevel(nivel)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+
 def main():
+    listener = _configurar_logging()
+    
     print("Bienvenido al Network Policy Manager de la UPSM")
     print("Código: 20202137")
     
@@ -1135,7 +1674,11 @@ def main():
     print("- Verifique que el módulo de reactive routing esté desactivado")
     
     # Iniciar el menú interactivo
-    menu(controller)
+    try:
+        menu(controller)
+    finally:
+        # Escribir los mensajes pendientes antes de terminar
+        listener.stop()
 
 
 if __name__ == "__main__":